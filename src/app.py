@@ -1,21 +1,35 @@
 import os
+import hmac
 
 import gradio as gr
 from dotenv import load_dotenv
 
+from src.generator import DEFAULT_CPU_MODEL_NAME
 from src.rag_pipeline import RAGPipeline
+from src.retriever import KBWatcher
 
 load_dotenv()
 
 pipeline = None
+kb_watcher = None
 
 
 def initialize():
-    global pipeline
+    global pipeline, kb_watcher
     if pipeline is None:
         print("Initializing RAG pipeline...")
-        pipeline = RAGPipeline(top_k=5)
-        print("Pipeline ready.")
+        dedup_threshold = os.getenv("RETRIEVAL_DEDUP_THRESHOLD")
+        pipeline = RAGPipeline(
+            top_k=5,
+            dedup_threshold=float(dedup_threshold) if dedup_threshold else None,
+        )
+        print(f"Pipeline ready (KB version: {pipeline.retriever.kb.version or 'unversioned'}).")
+
+    interval = float(os.getenv("KB_RELOAD_INTERVAL", "0"))
+    if interval > 0 and kb_watcher is None:
+        kb_watcher = KBWatcher(pipeline.retriever, interval=interval)
+        kb_watcher.start()
+        print(f"Watching KB manifest every {interval:g}s.")
 
 
 def chat(query: str, history: list) -> str:
@@ -32,10 +46,34 @@ def chat(query: str, history: list) -> str:
     return answer + sources_text
 
 
+def reload_kb(token: str) -> str:
+    admin_token = os.getenv("KB_ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(token.encode(), admin_token.encode()):
+        return "Invalid admin token."
+
+    retriever = pipeline.retriever
+    try:
+        reloaded = retriever.reload()
+    except ValueError as e:
+        return f"Reload rejected: {e}"
+
+    if reloaded:
+        return f"Reloaded KB version `{retriever.kb.version}` ({len(retriever.mapping)} chunks)."
+    return f"No reload: KB version `{retriever.kb.version}` is current or a reload is already running."
+
+
 def build_ui():
     mode = os.getenv("GENERATOR_MODE", "local").strip().lower()
-    model_label = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-7b-instruct") if mode == "api" else "Qwen2.5-7B-Instruct (local)"
-    mode_badge = f"🌐 API mode — `{model_label}`" if mode == "api" else f"💻 Local mode — `{model_label}`"
+    if mode == "api":
+        model_label = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-7b-instruct")
+        mode_badge = f"🌐 API mode — `{model_label}`"
+    elif mode == "cpu":
+        model_label = os.getenv("CPU_MODEL_NAME", DEFAULT_CPU_MODEL_NAME)
+        quantization = os.getenv("CPU_QUANTIZATION", "int8").strip().lower()
+        mode_badge = f"🖥️ CPU mode — `{model_label}` ({quantization})"
+    else:
+        model_label = "Qwen2.5-7B-Instruct (local)"
+        mode_badge = f"💻 Local mode — `{model_label}`"
 
     with gr.Blocks(
         title="چت‌بات مقررات دانشگاه شریف",
@@ -64,6 +102,13 @@ def build_ui():
             ],
         )
 
+        if os.getenv("KB_ADMIN_TOKEN"):
+            with gr.Accordion("Admin — reload knowledge base", open=False):
+                token_box = gr.Textbox(label="Admin token", type="password")
+                reload_button = gr.Button("Reload KB")
+                reload_status = gr.Markdown()
+                reload_button.click(reload_kb, inputs=token_box, outputs=reload_status)
+
     return demo
 
 
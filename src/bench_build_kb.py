@@ -0,0 +1,198 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import requests
+from bs4 import BeautifulSoup
+from tqdm import tqdm
+
+from src.build_kb import (
+    HTML_PARSER,
+    lxml,
+    get_rule_links,
+    parse_rule_html,
+    parse_table_to_markdown,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+FIXTURES_DIR = os.path.join(PROJECT_ROOT, "data", "fixtures", "rule_pages")
+FIXTURES_INDEX = "index.json"
+
+
+def reference_parse_rule_html(html, rule_info):
+    """
+    The original html.parser + find_all/find_parent implementation of
+    `process_rule_page`, kept as the reference the fast path is checked against.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    main_content = soup.find('main', id='writr__main')
+    if not main_content:
+        return []
+
+    elements = main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'table'])
+
+    chunks = []
+    current_chunk_text = ""
+    current_parent_section = "General"
+    current_section_title = "General"
+
+    split_pattern = r'^\s*(ماده\s*\d+|مقدمه|[الف-ی]\s*[:\)]?)'
+
+    def make_chunk():
+        return {
+            "rule_title": rule_info['title'],
+            "rule_url": rule_info['url'],
+            "rule_date": rule_info['date'],
+            "parent_section": current_parent_section,
+            "section_title": current_section_title,
+            "content": current_chunk_text.strip()
+        }
+
+    for el in elements:
+        if el.name != 'table' and el.find_parent('table'):
+            continue
+
+        if el.name == 'table':
+            current_chunk_text += parse_table_to_markdown(el)
+            continue
+
+        text = el.get_text(separator=' ', strip=True)
+        if not text:
+            continue
+
+        is_header = el.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+        is_strong_trigger = False
+        strong_text = ""
+
+        if not is_header:
+            strong_tag = el.find(['strong', 'b'])
+            if strong_tag:
+                strong_text = strong_tag.get_text(strip=True)
+                if text.startswith(strong_text) and re.match(split_pattern, text):
+                    is_strong_trigger = True
+
+        if is_header or is_strong_trigger:
+            if current_chunk_text.strip():
+                chunks.append(make_chunk())
+
+            if is_header:
+                current_parent_section = text
+                current_section_title = text
+            else:
+                current_section_title = strong_text
+            current_chunk_text = text + "\n"
+
+        elif el.name == 'li':
+            current_chunk_text += "- " + text + "\n"
+        else:
+            current_chunk_text += text + "\n"
+
+    if current_chunk_text.strip():
+        chunks.append(make_chunk())
+
+    return chunks
+
+
+def save_fixtures(fixtures_dir: str = FIXTURES_DIR):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    rules = get_rule_links()
+
+    saved = []
+    for i, rule in enumerate(tqdm(rules, desc="Downloading rule pages")):
+        response = requests.get(rule['url'])
+        response.raise_for_status()
+        filename = f"{i:03d}.html"
+        with open(os.path.join(fixtures_dir, filename), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        saved.append({**rule, "file": filename})
+
+    with open(os.path.join(fixtures_dir, FIXTURES_INDEX), "w", encoding="utf-8") as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2)
+    print(f"Saved {len(saved)} rule pages to {fixtures_dir}")
+
+
+def load_fixtures(fixtures_dir: str = FIXTURES_DIR) -> list[tuple[dict, str]]:
+    with open(os.path.join(fixtures_dir, FIXTURES_INDEX), "r", encoding="utf-8") as f:
+        rules = json.load(f)
+
+    pages = []
+    for rule in rules:
+        with open(os.path.join(fixtures_dir, rule["file"]), "r", encoding="utf-8") as f:
+            pages.append((rule, f.read()))
+    return pages
+
+
+def strip_ids(chunks: list[dict]) -> list[dict]:
+    return [{k: v for k, v in c.items() if k != "id"} for c in chunks]
+
+
+def check_equivalence(pages: list[tuple[dict, str]], parser: str) -> list[str]:
+    mismatches = []
+    for rule, html in pages:
+        expected = json.dumps(reference_parse_rule_html(html, rule), ensure_ascii=False)
+        actual = json.dumps(strip_ids(parse_rule_html(html, rule, parser=parser)), ensure_ascii=False)
+        if expected != actual:
+            mismatches.append(rule["url"])
+    return mismatches
+
+
+def pages_per_sec(parse_fn, pages: list[tuple[dict, str]], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for rule, html in pages:
+            parse_fn(html, rule)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the fast rule-page parser against the reference and report pages/sec."
+    )
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR)
+    parser.add_argument("--save-fixtures", action="store_true",
+                        help="download the current rule pages into the fixtures dir first")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.save_fixtures:
+        save_fixtures(args.fixtures_dir)
+
+    pages = load_fixtures(args.fixtures_dir)
+    print(f"Loaded {len(pages)} fixture pages from {args.fixtures_dir}")
+
+    backends = ["html.parser"]
+    if lxml is not None:
+        backends.append("lxml")
+
+    default_mismatches = []
+    for backend in backends:
+        mismatches = check_equivalence(pages, backend)
+        status = "identical" if not mismatches else f"{len(mismatches)} MISMATCHES"
+        default = " (default)" if backend == HTML_PARSER else ""
+        print(f"[{backend}{default}] chunks vs reference: {status}")
+        for url in mismatches:
+            print(f"  - {url}")
+        if backend == HTML_PARSER:
+            default_mismatches = mismatches
+
+    reference = pages_per_sec(reference_parse_rule_html, pages, args.repeat)
+    print(f"reference (html.parser, find_parent): {reference:8.1f} pages/sec")
+    for backend in backends:
+        fast = pages_per_sec(
+            lambda html, rule: parse_rule_html(html, rule, parser=backend),
+            pages, args.repeat,
+        )
+        print(f"fast ({backend}, single pass):{' ' * (16 - len(backend))}{fast:8.1f} pages/sec "
+              f"(x{fast / reference:.2f})")
+
+    if default_mismatches:
+        sys.exit(f"{HTML_PARSER} output differs from the reference parser on {len(default_mismatches)} pages.")
+
+
+if __name__ == "__main__":
+    main()
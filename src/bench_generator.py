@@ -0,0 +1,178 @@
+import io
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import torch
+from transformers import Qwen2Config, Qwen2ForCausalLM
+
+from src.generator import CPUGenerator, build_prompt, configure_cpu_threads, quantize_for_cpu
+
+BENCH_MODEL_NAME = "Qwen/Qwen2.5-0.5B-Instruct"
+BENCH_QUERY = "شرایط مشروطی دانشجوی کارشناسی چیست؟"
+BENCH_CONTEXT = (
+    "[آیین‌نامه آموزشی دوره کارشناسی | ماده ۲۴]\n"
+    "اگر میانگین نمرات دانشجو در هر نیم‌سال تحصیلی کمتر از ۱۲ باشد، "
+    "دانشجو در آن نیم‌سال مشروط تلقی می‌شود."
+)
+
+# Qwen2.5-0.5B-Instruct's architecture, for --random-weights runs on nodes
+# that can't download the model (random weights cost the same to run)
+BENCH_CONFIG = dict(
+    vocab_size=151936,
+    hidden_size=896,
+    intermediate_size=4864,
+    num_hidden_layers=24,
+    num_attention_heads=14,
+    num_key_value_heads=2,
+    max_position_embeddings=32768,
+    tie_word_embeddings=True,
+)
+RANDOM_PROMPT_TOKENS = 800
+
+
+def proc_status_mb(field: str) -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def state_dict_mb(model) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def load_random_weights(quantization: str, num_threads: int | None):
+    threads = configure_cpu_threads(num_threads)
+    torch.manual_seed(0)
+    model = Qwen2ForCausalLM(Qwen2Config(**BENCH_CONFIG)).to(torch.float32)
+    quantize_for_cpu(model, quantization)
+    input_ids = torch.randint(0, BENCH_CONFIG["vocab_size"], (1, RANDOM_PROMPT_TOKENS))
+    inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+    return model, inputs, threads
+
+
+def load_pretrained(model_name: str, quantization: str, num_threads: int | None):
+    generator = CPUGenerator(model_name, quantization=quantization, num_threads=num_threads)
+    messages = build_prompt(BENCH_QUERY, BENCH_CONTEXT)
+    text = generator.tokenizer.apply_chat_template(
+        messages, tokenize=False, add_generation_prompt=True
+    )
+    inputs = generator.tokenizer(text, return_tensors="pt")
+    return generator.model, inputs, generator.num_threads
+
+
+def run_variant(model_name: str, quantization: str, num_threads: int | None,
+                new_tokens: int, runs: int, random_weights: bool) -> dict:
+    start = time.perf_counter()
+    if random_weights:
+        model, inputs, threads = load_random_weights(quantization, num_threads)
+    else:
+        model, inputs, threads = load_pretrained(model_name, quantization, num_threads)
+    load_seconds = time.perf_counter() - start
+
+    def greedy(max_new_tokens):
+        with torch.no_grad():
+            model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=0,
+            )
+
+    def seconds_per_run(max_new_tokens):
+        start = time.perf_counter()
+        for _ in range(runs):
+            greedy(max_new_tokens)
+        return (time.perf_counter() - start) / runs
+
+    greedy(new_tokens)  # warm-up
+    # A single new token is (almost) only the prefill of the prompt
+    prefill_seconds = seconds_per_run(1)
+    total_seconds = seconds_per_run(new_tokens)
+
+    # Read /proc before state_dict_mb, whose serialization buffer counts in RSS
+    rss_mb = proc_status_mb("VmRSS")
+    # Peak includes the fp32 load before quantization
+    peak_rss_mb = proc_status_mb("VmHWM")
+
+    return {
+        "quantization": quantization,
+        "threads": threads,
+        "prompt_tokens": inputs["input_ids"].shape[1],
+        "load_seconds": load_seconds,
+        "prefill_seconds": prefill_seconds,
+        "decode_tokens_per_sec": (new_tokens - 1) / (total_seconds - prefill_seconds),
+        "e2e_tokens_per_sec": new_tokens / total_seconds,
+        "rss_mb": rss_mb,
+        "peak_rss_mb": peak_rss_mb,
+        "weights_mb": state_dict_mb(model),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare CPUGenerator int8 against the fp32 baseline (prefill, decode tokens/sec and memory)."
+    )
+    parser.add_argument("--model", default=BENCH_MODEL_NAME)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--random-weights", action="store_true",
+                        help="use a randomly initialized Qwen2.5-0.5B-shaped model instead of downloading --model")
+    parser.add_argument("--variant", choices=["fp32", "int8"],
+                        help="run a single variant in this process and print its result as JSON")
+    args = parser.parse_args()
+    if args.new_tokens < 2:
+        parser.error("--new-tokens must be at least 2 to time decoding separately from prefill")
+
+    if args.variant:
+        result = run_variant(args.model, args.variant, args.threads, args.new_tokens,
+                             args.runs, args.random_weights)
+        print(json.dumps(result))
+        return
+
+    # Each variant runs in its own process so RSS isn't polluted by the other
+    results = []
+    for variant in ["fp32", "int8"]:
+        cmd = [
+            sys.executable, "-m", "src.bench_generator",
+            "--variant", variant,
+            "--model", args.model,
+            "--new-tokens", str(args.new_tokens),
+            "--runs", str(args.runs),
+        ]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        if args.random_weights:
+            cmd.append("--random-weights")
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    model_label = "random Qwen2.5-0.5B-shaped weights" if args.random_weights else args.model
+    print(f"Model: {model_label}, {args.new_tokens} new tokens x {args.runs} runs, "
+          f"{results[0]['threads']} threads, {results[0]['prompt_tokens']} prompt tokens")
+    print(f"{'':6}{'prefill s':>10}{'decode tok/s':>14}{'e2e tok/s':>11}"
+          f"{'weights MB':>12}{'RSS MB':>10}{'peak MB':>10}{'load s':>8}")
+    for r in results:
+        print(f"{r['quantization']:6}{r['prefill_seconds']:10.2f}{r['decode_tokens_per_sec']:14.2f}"
+              f"{r['e2e_tokens_per_sec']:11.2f}{r['weights_mb']:12.1f}"
+              f"{r['rss_mb']:10.1f}{r['peak_rss_mb']:10.1f}{r['load_seconds']:8.1f}")
+
+    baseline, quantized = results
+    print(f"int8 vs fp32 ({results[0]['prompt_tokens']} prompt tokens, {args.new_tokens} new tokens): "
+          f"x{baseline['prefill_seconds'] / quantized['prefill_seconds']:.2f} prefill speed, "
+          f"x{quantized['decode_tokens_per_sec'] / baseline['decode_tokens_per_sec']:.2f} decode tokens/sec, "
+          f"x{quantized['e2e_tokens_per_sec'] / baseline['e2e_tokens_per_sec']:.2f} end-to-end tokens/sec, "
+          f"x{quantized['weights_mb'] / baseline['weights_mb']:.2f} weights, "
+          f"x{quantized['rss_mb'] / baseline['rss_mb']:.2f} RSS, "
+          f"x{quantized['peak_rss_mb'] / baseline['peak_rss_mb']:.2f} peak RSS")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import os
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import urllib.parse
 import re
 import uuid
 import json
 from tqdm import tqdm
 
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
 BASE_URL = "https://ac.sharif.edu"
 MAIN_RULES_URL = "https://ac.sharif.edu/rules/"
 
@@ -37,111 +42,237 @@ def get_rule_links():
     return links
 
 
-def parse_table_to_markdown(table_tag):
-    markdown = "\n"
-    rows = table_tag.find_all('tr')
+WHITESPACE_RE = re.compile(r'\s+')
+HEADER_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+CONTENT_TAGS = HEADER_TAGS | {'p', 'li', 'table'}
+SPLIT_PATTERN = re.compile(r'^\s*(ماده\s*\d+|مقدمه|[الف-ی]\s*[:\)]?)')
+
+# Strings inside these tags are not part of BeautifulSoup's get_text()
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# html.parser gives the same chunks as the original find_all/find_parent code,
+# but most of its time is spent in the parser itself, so the single-pass walk
+# only makes it slightly faster. lxml is several times faster but repairs
+# malformed markup differently
+# (e.g. an unclosed <p> or a <table> inside a <p>), so it is opt-in and
+# should be checked with src/bench_build_kb.py before rebuilding the KB.
+HTML_PARSER = os.getenv("KB_HTML_PARSER", "html.parser").strip().lower()
+
+
+def rows_to_markdown(rows):
     if not rows:
         return ""
-    
-    for i, row in enumerate(rows):
-        cols = row.find_all(['th', 'td'])
-        row_data = [re.sub(r'\s+', ' ', col.get_text(strip=True)) for col in cols]
-        
+
+    markdown = "\n"
+    for i, row_data in enumerate(rows):
         if not any(row_data):
             continue
-            
+
         markdown += "| " + " | ".join(row_data) + " |\n"
-        
+
         if i == 0:
-            markdown += "|" + "|".join(["---"] * len(cols)) + "|\n"
-            
+            markdown += "|" + "|".join(["---"] * len(row_data)) + "|\n"
+
     return markdown + "\n"
 
 
-def process_rule_page(rule_info):
-    response = requests.get(rule_info['url'])
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
+def parse_table_to_markdown(table_tag):
+    rows = [
+        [WHITESPACE_RE.sub(' ', col.get_text(strip=True)) for col in row.find_all(['th', 'td'])]
+        for row in table_tag.find_all('tr')
+    ]
+    return rows_to_markdown(rows)
+
+
+def iter_soup_blocks(main_content):
+    """
+    Walks the BeautifulSoup tree once in document order and yields
+    (tag name, text, strong text) for each heading/p/li, or
+    ('table', markdown, None) for each table. The strong text is None when
+    the element has no <strong>/<b>. Tags inside a table are skipped
+    by tracking the table depth, nested tables are still yielded.
+    """
+    table_depth = 0
+    stack = [(iter(main_content.children), False)]
+    while stack:
+        children, is_table = stack[-1]
+        node = next(children, None)
+        if node is None:
+            stack.pop()
+            if is_table:
+                table_depth -= 1
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name
+        if name == 'table':
+            yield name, parse_table_to_markdown(node), None
+            table_depth += 1
+            stack.append((iter(node.children), True))
+            continue
+
+        if name in CONTENT_TAGS and not table_depth:
+            strong_text = None
+            if name not in HEADER_TAGS:
+                strong_tag = node.find(['strong', 'b'])
+                if strong_tag:
+                    strong_text = strong_tag.get_text(strip=True)
+            yield name, node.get_text(separator=' ', strip=True), strong_text
+        stack.append((iter(node.children), False))
+
+
+def lxml_strings(el):
+    if el.text and el.tag not in NON_TEXT_TAGS:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            yield from lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def lxml_text(el, separator=''):
+    """Same output as BeautifulSoup's get_text(separator, strip=True)."""
+    return separator.join(s for s in map(str.strip, lxml_strings(el)) if s)
+
+
+def lxml_table_to_markdown(table_el):
+    rows = [
+        [WHITESPACE_RE.sub(' ', lxml_text(col)) for col in row.iter('th', 'td')]
+        for row in table_el.iter('tr')
+    ]
+    return rows_to_markdown(rows)
+
+
+def iter_lxml_blocks(main_content):
+    """lxml counterpart of iter_soup_blocks, yielding the same blocks."""
+    table_depth = 0
+    stack = [(iter(main_content), False)]
+    while stack:
+        children, is_table = stack[-1]
+        node = next(children, None)
+        if node is None:
+            stack.pop()
+            if is_table:
+                table_depth -= 1
+            continue
+        if not isinstance(node.tag, str):
+            continue
+
+        name = node.tag
+        if name == 'table':
+            yield name, lxml_table_to_markdown(node), None
+            table_depth += 1
+            stack.append((iter(node), True))
+            continue
+
+        if name in CONTENT_TAGS and not table_depth:
+            strong_text = None
+            if name not in HEADER_TAGS:
+                strong_tag = next(node.iter('strong', 'b'), None)
+                if strong_tag is not None:
+                    strong_text = lxml_text(strong_tag)
+            yield name, lxml_text(node, separator=' '), strong_text
+        stack.append((iter(node), False))
+
+
+def find_main_content(html, parser=HTML_PARSER):
+    """Returns (main element, block iterator) for the page body, or None."""
+    if parser == 'lxml':
+        if lxml is None:
+            raise ValueError("KB_HTML_PARSER=lxml requires the lxml package to be installed.")
+        try:
+            root = lxml.html.document_fromstring(
+                html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8')
+            )
+        except lxml.etree.ParserError:
+            return None
+        matches = root.xpath('//main[@id="writr__main"]')
+        return (matches[0], iter_lxml_blocks) if matches else None
+
+    # The whole document is parsed (no SoupStrainer): how html.parser treats a
+    # stray closing tag inside <main> depends on <main>'s ancestors
+    soup = BeautifulSoup(html, parser)
     main_content = soup.find('main', id='writr__main')
-    if not main_content:
+    return (main_content, iter_soup_blocks) if main_content else None
+
+
+def make_chunk(rule_info, parent_section, section_title, content):
+    return {
+        "id": str(uuid.uuid4()),
+        "rule_title": rule_info['title'],
+        "rule_url": rule_info['url'],
+        "rule_date": rule_info['date'],
+        "parent_section": parent_section,
+        "section_title": section_title,
+        "content": content
+    }
+
+
+def parse_rule_html(html, rule_info, parser=HTML_PARSER):
+    found = find_main_content(html, parser)
+    if not found:
         return []
+    main_content, iter_blocks = found
 
-    elements = main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'table'])
-    
     chunks = []
     current_chunk_text = ""
     current_parent_section = "General"
     current_section_title = "General"
-    
-    split_pattern = r'^\s*(ماده\s*\d+|مقدمه|[الف-ی]\s*[:\)]?)'
 
-    for el in elements:
-        if el.name != 'table' and el.find_parent('table'):
-            continue
-            
-        if el.name == 'table':
-            current_chunk_text += parse_table_to_markdown(el)
+    for name, text, strong_text in iter_blocks(main_content):
+        if name == 'table':
+            current_chunk_text += text
             continue
 
-        text = el.get_text(separator=' ', strip=True)
         if not text:
             continue
 
-        is_header = el.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-        is_strong_trigger = False
-        strong_text = ""
-        
-        if not is_header:
-            strong_tag = el.find(['strong', 'b'])
-            if strong_tag:
-                strong_text = strong_tag.get_text(strip=True)
-                if text.startswith(strong_text) and re.match(split_pattern, text):
-                    is_strong_trigger = True
+        is_header = name in HEADER_TAGS
+        is_strong_trigger = (
+            strong_text is not None
+            and text.startswith(strong_text)
+            and SPLIT_PATTERN.match(text) is not None
+        )
 
         if is_header or is_strong_trigger:
             if current_chunk_text.strip():
-                chunks.append({
-                    "id": str(uuid.uuid4()),
-                    "rule_title": rule_info['title'],
-                    "rule_url": rule_info['url'],
-                    "rule_date": rule_info['date'],
-                    "parent_section": current_parent_section,
-                    "section_title": current_section_title,
-                    "content": current_chunk_text.strip()
-                })
-            
+                chunks.append(make_chunk(
+                    rule_info, current_parent_section,
+                    current_section_title, current_chunk_text.strip()
+                ))
+
             if is_header:
                 current_parent_section = text
                 current_section_title = text
-                current_chunk_text = text + "\n"
             else:
                 current_section_title = strong_text
-                current_chunk_text = text + "\n"
-        
+            current_chunk_text = text + "\n"
+
+        elif name == 'li':
+            current_chunk_text += "- " + text + "\n"
         else:
-            if el.name == 'li':
-                current_chunk_text += "- " + text + "\n"
-            else:
-                current_chunk_text += text + "\n"
-    
+            current_chunk_text += text + "\n"
+
     if current_chunk_text.strip():
-        chunks.append({
-            "id": str(uuid.uuid4()),
-            "rule_title": rule_info['title'],
-            "rule_url": rule_info['url'],
-            "rule_date": rule_info['date'],
-            "parent_section": current_parent_section,
-            "section_title": current_section_title,
-            "content": current_chunk_text.strip()
-        })
-        
+        chunks.append(make_chunk(
+            rule_info, current_parent_section,
+            current_section_title, current_chunk_text.strip()
+        ))
+
     return chunks
 
 
+def process_rule_page(rule_info):
+    response = requests.get(rule_info['url'])
+    response.raise_for_status()
+    return parse_rule_html(response.text, rule_info)
+
+
 def main():
     rules = get_rule_links()
-    print(f"{len(rules)} rules found. Processing...")
+    print(f"{len(rules)} rules found. Processing with {HTML_PARSER}...")
     
     all_chunks = []
     
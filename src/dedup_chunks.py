@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import zlib
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+CHUNKS_PATH = os.path.join(DATA_DIR, "sharif_rules_chunks.json")
+DEDUP_CHUNKS_PATH = os.path.join(DATA_DIR, "sharif_rules_chunks_dedup.json")
+
+SHINGLE_SIZE = 3
+# Shorter chunks (bare headings like «ماده ۱. تعاریف») look identical across
+# unrelated rules, so they are never collapsed
+MIN_SHINGLES = 5
+NUM_PERM = 128
+NUM_BANDS = 16
+JACCARD_THRESHOLD = 0.8
+SEED = 42
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+CHAR_MAP = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "‌": "",  # ZWNJ: «می‌شود» and «میشود» are the same word
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # Persian digits
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic digits
+})
+DIACRITICS_RE = re.compile(r"[ً-ٰٟـ]")
+NON_WORD_RE = re.compile(r"[^\w\s]|_")
+
+
+def normalize_text(text: str) -> str:
+    text = DIACRITICS_RE.sub("", text.translate(CHAR_MAP)).lower()
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash_signatures(shingle_sets: list[set[str]], num_perm: int = NUM_PERM, seed: int = SEED) -> np.ndarray:
+    """One MinHash signature (row) per shingle set, using (a*x + b) mod p permutations."""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(shingle_sets), num_perm), MAX_HASH, dtype=np.uint64)
+    for i, shingle_set in enumerate(shingle_sets):
+        if not shingle_set:
+            continue
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingle_set], dtype=np.uint64)
+        permuted = np.bitwise_and((np.outer(hashes, a) + b) % MERSENNE_PRIME, MAX_HASH)
+        signatures[i] = permuted.min(axis=0)
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, num_bands: int = NUM_BANDS) -> set[tuple[int, int]]:
+    rows_per_band = signatures.shape[1] // num_bands
+    pairs = set()
+    for band in range(num_bands):
+        buckets = {}
+        band_slice = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i, key in enumerate(band_slice):
+            buckets.setdefault(key.tobytes(), []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def date_key(rule_date: str) -> tuple[int, ...]:
+    """'۱۴۰۲/۰۹/۲۰' -> (1402, 9, 20); unparseable dates sort first."""
+    return tuple(int(part) for part in re.findall(r"\d+", rule_date.translate(CHAR_MAP)))
+
+
+def find_duplicate_clusters(
+    chunks: list[dict],
+    threshold: float = JACCARD_THRESHOLD,
+    num_perm: int = NUM_PERM,
+    num_bands: int = NUM_BANDS,
+    min_shingles: int = MIN_SHINGLES,
+) -> list[list[int]]:
+    """
+    Groups chunk indices whose normalized shingle sets have a Jaccard
+    similarity >= threshold. LSH only proposes candidates; every pair is
+    checked against the exact Jaccard before it is merged. Chunks with fewer
+    than min_shingles shingles stay on their own.
+    """
+    shingle_sets = [shingles(c["content"]) for c in chunks]
+    shingle_sets = [s if len(s) >= min_shingles else set() for s in shingle_sets]
+    signatures = minhash_signatures(shingle_sets, num_perm=num_perm)
+
+    parent = list(range(len(chunks)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in lsh_candidate_pairs(signatures, num_bands=num_bands):
+        if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+            parent[find(i)] = find(j)
+
+    clusters = {}
+    for i in range(len(chunks)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def source_entry(chunk: dict) -> dict:
+    return {
+        "id": chunk["id"],
+        "rule_title": chunk["rule_title"],
+        "rule_url": chunk["rule_url"],
+        "rule_date": chunk["rule_date"],
+        "section_title": chunk["section_title"],
+    }
+
+
+def collapse_near_duplicates(chunks: list[dict], threshold: float = JACCARD_THRESHOLD) -> list[dict]:
+    """
+    Collapses each cluster of near-duplicate chunks into one canonical chunk:
+    the one from the most recent rule (then the longest). Its "sources" list
+    records every chunk collapsed into it, canonical first; their wording
+    may differ slightly from the canonical text.
+    """
+    collapsed = []
+    for cluster in find_duplicate_clusters(chunks, threshold=threshold):
+        canonical_idx = max(
+            cluster,
+            key=lambda i: (date_key(chunks[i]["rule_date"]), len(chunks[i]["content"])),
+        )
+        others = [i for i in cluster if i != canonical_idx]
+
+        chunk = dict(chunks[canonical_idx])
+        chunk["sources"] = [source_entry(chunks[i]) for i in [canonical_idx] + others]
+        collapsed.append((canonical_idx, chunk))
+
+    collapsed.sort(key=lambda item: item[0])
+    return [chunk for _, chunk in collapsed]
+
+
+def flat_index_mb(num_vectors: int, dim: int) -> float:
+    """Size of a float32 IndexFlat holding num_vectors vectors."""
+    return num_vectors * dim * 4 / (1024 * 1024)
+
+
+def print_dedup_report(before: list[dict], after: list[dict], dim: int | None = None):
+    removed = len(before) - len(after)
+    merged = sum(1 for c in after if len(c.get("sources", [])) > 1)
+    print(f"Near-duplicate collapse: {len(before)} -> {len(after)} chunks "
+          f"({removed} removed, {merged} canonical chunks with multiple sources, "
+          f"{removed / max(len(before), 1):.1%} smaller index)")
+    if dim:
+        print(f"Flat index size: {flat_index_mb(len(before), dim):.2f} MB -> "
+              f"{flat_index_mb(len(after), dim):.2f} MB")
+
+
+def main():
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    deduped = collapse_near_duplicates(chunks)
+    print_dedup_report(chunks, deduped)
+
+    for chunk in deduped:
+        if len(chunk["sources"]) > 1:
+            print(f"- {chunk['rule_title']} | {chunk['section_title']}")
+            for source in chunk["sources"][1:]:
+                print(f"    similar: {source['rule_title']} ({source['rule_date']}) | {source['section_title']}")
+
+    with open(DEDUP_CHUNKS_PATH, "w", encoding="utf-8") as f:
+        json.dump(deduped, f, ensure_ascii=False, indent=4)
+    print(f"Saved to '{DEDUP_CHUNKS_PATH}'")
+
+
+if __name__ == "__main__":
+    main()
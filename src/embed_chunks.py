@@ -5,6 +5,17 @@ import faiss
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 
+from src.dedup_chunks import collapse_near_duplicates, print_dedup_report
+from src.kb_manifest import (
+    MANIFEST_PATH,
+    build_manifest,
+    new_version,
+    prune_versions,
+    save_manifest,
+    versioned_path,
+    write_atomic,
+)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
@@ -55,9 +66,14 @@ def save_mapping(chunks: list[dict], path: str):
             "parent_section": chunk["parent_section"],
             "section_title": chunk["section_title"],
             "content": chunk["content"],
+            "sources": chunk.get("sources", []),
         })
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, ensure_ascii=False, indent=2)
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(mapping, f, ensure_ascii=False, indent=2)
+
+    write_atomic(path, write)
 
 
 def main():
@@ -65,6 +81,10 @@ def main():
     chunks = load_chunks(CHUNKS_PATH)
     print(f"Loaded {len(chunks)} chunks from {CHUNKS_PATH}")
 
+    print("Collapsing near-duplicate chunks...")
+    raw_chunks = chunks
+    chunks = collapse_near_duplicates(raw_chunks)
+
     print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}")
     model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
@@ -80,17 +100,35 @@ def main():
     )
     embeddings = np.array(embeddings, dtype="float32")
     print(f"Embeddings shape: {embeddings.shape}")
+    print_dedup_report(raw_chunks, chunks, dim=embeddings.shape[1])
 
     print("Building FAISS index...")
     index = build_faiss_index(embeddings)
 
-    print(f"Saving FAISS index to {INDEX_PATH}")
-    faiss.write_index(index, INDEX_PATH)
+    # Every build gets its own files, so the running app's KB is never
+    # overwritten and earlier builds stay available for rollback
+    version = new_version()
+    index_path = versioned_path(INDEX_PATH, version)
+    mapping_path = versioned_path(MAPPING_PATH, version)
 
-    print(f"Saving chunk mapping to {MAPPING_PATH}")
-    save_mapping(chunks, MAPPING_PATH)
+    print(f"Saving FAISS index to {index_path}")
+    write_atomic(index_path, lambda tmp_path: faiss.write_index(index, tmp_path))
+
+    print(f"Saving chunk mapping to {mapping_path}")
+    save_mapping(chunks, mapping_path)
+
+    # Written last: a running app only picks up the new KB once this changes
+    manifest = build_manifest(
+        version, index_path, mapping_path,
+        model_name=EMBEDDING_MODEL_NAME,
+        dim=index.d,
+        chunk_count=index.ntotal,
+    )
+    print(f"Saving KB manifest (version {version}) to {MANIFEST_PATH}")
+    save_manifest(manifest, MANIFEST_PATH)
+    prune_versions(MANIFEST_PATH)
 
-    print("Done! Index and mapping saved.")
+    print("Done! Index, mapping and manifest saved.")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,16 @@
+import os
+
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from accelerate import init_empty_weights
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 from openai import OpenAI
 
 
 DEFAULT_MODEL_NAME = "Qwen/Qwen2.5-7B-Instruct"
+# The CPU backend loads in fp32 before quantizing (~4 bytes per parameter at
+# peak, ~30 GB for the 7B model), so it defaults to a model that fits a
+# typical CPU node
+DEFAULT_CPU_MODEL_NAME = "Qwen/Qwen2.5-1.5B-Instruct"
 DEFAULT_API_MODEL = "qwen/qwen-2.5-7b-instruct"
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
@@ -147,6 +154,91 @@ class Generator:
         new_tokens = output_ids[0][inputs["input_ids"].shape[1]:]
         return self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
 
+
+def configure_cpu_threads(num_threads: int | None = None) -> int:
+    """
+    Uses one intra-op thread per core available to this process and a single
+    inter-op thread, since generation runs one forward pass at a time.
+    """
+    if not num_threads:
+        num_threads = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+    return num_threads
+
+
+def available_memory_bytes() -> int | None:
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def fp32_load_bytes(model_name: str) -> int:
+    """Size of the model's weights in fp32, counted without allocating them."""
+    config = AutoConfig.from_pretrained(model_name, trust_remote_code=True)
+    with init_empty_weights():
+        empty_model = AutoModelForCausalLM.from_config(config, trust_remote_code=True)
+    empty_model.tie_weights()
+    return sum(p.numel() for p in empty_model.parameters()) * 4
+
+
+def quantize_for_cpu(model, quantization: str):
+    if quantization == "int8":
+        torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model.eval()
+
+
+class CPUGenerator(Generator):
+    """
+    Generator for nodes without a GPU. bitsandbytes needs CUDA, so the model
+    is loaded in fp32 and its Linear layers are quantized to int8 with torch
+    dynamic quantization. Peak memory is therefore the fp32 size of the model,
+    which is checked against available RAM before loading.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_CPU_MODEL_NAME,
+        quantization: str = "int8",
+        num_threads: int | None = None,
+    ):
+        if quantization not in ("int8", "fp32"):
+            raise ValueError(
+                f"Unsupported CPU quantization '{quantization}', expected 'int8' or 'fp32'."
+            )
+        required = fp32_load_bytes(model_name)
+        available = available_memory_bytes()
+        if available is not None and required > available:
+            raise ValueError(
+                f"Loading {model_name} on CPU needs ~{required / 2**30:.1f} GB of RAM "
+                f"(fp32 weights, before quantization), but only {available / 2**30:.1f} GB "
+                f"is available. Set CPU_MODEL_NAME to a smaller model."
+            )
+        self.num_threads = configure_cpu_threads(num_threads)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            model_name, trust_remote_code=True
+        )
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True,
+        )
+        quantize_for_cpu(self.model, quantization)
+
+
 class APIGenerator:
 
     def __init__(
@@ -0,0 +1,162 @@
+import os
+import glob
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+MANIFEST_PATH = os.path.join(DATA_DIR, "kb_manifest.json")
+KEEP_VERSIONS = 3
+
+
+class ChecksumMismatchError(ValueError):
+    pass
+
+
+def file_checksum(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def write_atomic(path: str, write_fn):
+    """
+    Calls write_fn(tmp_path) and moves the result over `path`, so a reader
+    never sees a half-written artifact.
+    """
+    tmp_path = f"{path}.tmp"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def versioned_path(path: str, version: str) -> str:
+    """'data/faiss_index.bin' -> 'data/faiss_index.<version>.bin'"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{version}{ext}"
+
+
+def build_manifest(
+    version: str,
+    index_path: str,
+    mapping_path: str,
+    model_name: str,
+    dim: int,
+    chunk_count: int,
+) -> dict:
+    return {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": model_name,
+        "dim": dim,
+        "chunk_count": chunk_count,
+        "index_file": os.path.basename(index_path),
+        "index_sha256": file_checksum(index_path),
+        "mapping_file": os.path.basename(mapping_path),
+        "mapping_sha256": file_checksum(mapping_path),
+    }
+
+
+def resolve_artifacts(manifest: dict, manifest_path: str = MANIFEST_PATH) -> tuple[str, str]:
+    """Index and mapping paths of a manifest, which sit next to the manifest file."""
+    base_dir = os.path.dirname(manifest_path)
+    return (
+        os.path.join(base_dir, manifest["index_file"]),
+        os.path.join(base_dir, manifest["mapping_file"]),
+    )
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    """
+    Saves a copy of the manifest under its version (for rollback), then
+    makes it the active one.
+    """
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    write_atomic(versioned_path(path, manifest["version"]), write)
+    write_atomic(path, write)
+
+
+def list_versions(path: str = MANIFEST_PATH) -> list[str]:
+    root, ext = os.path.splitext(path)
+    return sorted(
+        p[len(root) + 1:-len(ext)]
+        for p in glob.glob(f"{glob.escape(root)}.*{ext}")
+    )
+
+
+def activate_version(version: str, path: str = MANIFEST_PATH) -> dict:
+    """Makes an earlier build the active KB again (a running app reloads it)."""
+    manifest = load_manifest(versioned_path(path, version))
+    if manifest is None:
+        raise ValueError(f"No KB version {version} found next to {path}")
+    save_manifest(manifest, path)
+    return manifest
+
+
+def prune_versions(path: str = MANIFEST_PATH, keep: int = KEEP_VERSIONS):
+    """Deletes all but the `keep` most recent builds, never the active one."""
+    active = load_manifest(path)
+    active_version = active["version"] if active else None
+
+    for version in list_versions(path)[:-keep]:
+        if version == active_version:
+            continue
+        version_manifest_path = versioned_path(path, version)
+        manifest = load_manifest(version_manifest_path)
+        for artifact in resolve_artifacts(manifest, path):
+            if os.path.exists(artifact):
+                os.remove(artifact)
+        os.remove(version_manifest_path)
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_verified(path: str, expected_sha256: str) -> bytes:
+    """
+    Reads `path` and checks it against the manifest checksum, so what gets
+    loaded is exactly what the manifest describes. Raises
+    ChecksumMismatchError otherwise (e.g. a rebuild is still writing files).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != expected_sha256:
+        raise ChecksumMismatchError(f"Checksum mismatch for {path}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List KB versions or roll back to one.")
+    parser.add_argument("--activate", metavar="VERSION",
+                        help="make VERSION the active KB again")
+    args = parser.parse_args()
+
+    if args.activate:
+        manifest = activate_version(args.activate)
+        print(f"Activated KB version {manifest['version']} ({manifest['chunk_count']} chunks)")
+        return
+
+    active = load_manifest()
+    for version in list_versions():
+        marker = "*" if active and version == active["version"] else " "
+        print(f"{marker} {version}")
+
+
+if __name__ == "__main__":
+    main()
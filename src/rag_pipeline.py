@@ -3,12 +3,12 @@ import os
 from dotenv import load_dotenv
 
 from src.retriever import Retriever, format_retrieved_context
-from src.generator import Generator, APIGenerator
+from src.generator import DEFAULT_CPU_MODEL_NAME, Generator, CPUGenerator, APIGenerator
 
 load_dotenv()
 
 
-def create_generator() -> Generator | APIGenerator:
+def create_generator() -> Generator | CPUGenerator | APIGenerator:
     mode = os.getenv("GENERATOR_MODE", "local").strip().lower()
 
     if mode == "api":
@@ -20,6 +20,14 @@ def create_generator() -> Generator | APIGenerator:
         model = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-7b-instruct")
         return APIGenerator(api_key=api_key, model=model)
 
+    if mode == "cpu":
+        num_threads = os.getenv("CPU_NUM_THREADS")
+        return CPUGenerator(
+            model_name=os.getenv("CPU_MODEL_NAME", DEFAULT_CPU_MODEL_NAME),
+            quantization=os.getenv("CPU_QUANTIZATION", "int8").strip().lower(),
+            num_threads=int(num_threads) if num_threads else None,
+        )
+
     return Generator()
 
 
@@ -27,15 +35,19 @@ class RAGPipeline:
     def __init__(
         self,
         retriever: Retriever | None = None,
-        generator: Generator | APIGenerator | None = None,
+        generator: Generator | CPUGenerator | APIGenerator | None = None,
         top_k: int = 5,
+        dedup_threshold: float | None = None,
     ):
         self.retriever = retriever or Retriever()
         self.generator = generator or create_generator()
         self.top_k = top_k
+        self.dedup_threshold = dedup_threshold
 
     def answer(self, query: str) -> dict:
-        retrieved = self.retriever.retrieve(query, top_k=self.top_k)
+        retrieved = self.retriever.retrieve(
+            query, top_k=self.top_k, dedup_threshold=self.dedup_threshold
+        )
         context = format_retrieved_context(retrieved)
         answer = self.generator.generate(query, context)
 
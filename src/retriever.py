@@ -1,9 +1,18 @@
 import os
 import json
+import threading
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 
+from src.kb_manifest import (
+    MANIFEST_PATH,
+    ChecksumMismatchError,
+    load_manifest,
+    read_verified,
+    resolve_artifacts,
+)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
@@ -13,43 +22,229 @@ MAPPING_PATH = os.path.join(DATA_DIR, "chunk_mapping.json")
 
 EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-base"
 
+# With query-time dedup, search this many times top_k so dropped duplicates
+# can be replaced by the next distinct results
+DEDUP_OVERFETCH = 3
+
+
+class KnowledgeBase:
+    """An index, its chunk mapping and the manifest they were built with."""
+
+    def __init__(self, index, mapping: list[dict], manifest: dict | None):
+        self.index = index
+        self.mapping = mapping
+        self.manifest = manifest
+
+    @property
+    def version(self) -> str | None:
+        return self.manifest["version"] if self.manifest else None
+
+
+def load_knowledge_base(
+    index_path: str,
+    mapping_path: str,
+    manifest: dict | None = None,
+) -> KnowledgeBase:
+    index = faiss.read_index(index_path)
+    with open(mapping_path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    return KnowledgeBase(index, mapping, manifest)
+
+
+def load_verified_knowledge_base(
+    index_path: str,
+    mapping_path: str,
+    manifest: dict,
+) -> KnowledgeBase:
+    index_bytes = read_verified(index_path, manifest["index_sha256"])
+    index = faiss.deserialize_index(np.frombuffer(index_bytes, dtype="uint8"))
+    del index_bytes
+
+    mapping = json.loads(read_verified(mapping_path, manifest["mapping_sha256"]))
+    return KnowledgeBase(index, mapping, manifest)
+
 
 class Retriever:
     def __init__(
         self,
-        index_path: str = INDEX_PATH,
-        mapping_path: str = MAPPING_PATH,
+        index_path: str | None = None,
+        mapping_path: str | None = None,
         model_name: str = EMBEDDING_MODEL_NAME,
+        manifest_path: str = MANIFEST_PATH,
     ):
-        self.index = faiss.read_index(index_path)
-        with open(mapping_path, "r", encoding="utf-8") as f:
-            self.mapping = json.load(f)
+        """
+        Loads the KB the manifest points to. If index_path/mapping_path are
+        given, or there is no manifest (builds that predate it), those files
+        are loaded as-is instead, defaulting to INDEX_PATH/MAPPING_PATH.
+        """
+        self.manifest_path = manifest_path
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        self._reload_lock = threading.Lock()
+
+        manifest = None
+        if index_path is None and mapping_path is None:
+            manifest = load_manifest(manifest_path)
+
+        if manifest is not None:
+            self.kb = self._load_checked(manifest)
+        else:
+            self.kb = load_knowledge_base(index_path or INDEX_PATH, mapping_path or MAPPING_PATH)
+
+    @property
+    def index(self):
+        return self.kb.index
+
+    @property
+    def mapping(self) -> list[dict]:
+        return self.kb.mapping
+
+    def _load_checked(self, manifest: dict) -> KnowledgeBase:
+        """Loads a manifest's KB, raising ValueError if it doesn't fit this retriever."""
+        if manifest["embedding_model"] != self.model_name:
+            raise ValueError(
+                f"KB {manifest['version']} was embedded with "
+                f"{manifest['embedding_model']}, but the retriever uses {self.model_name}."
+            )
+
+        index_path, mapping_path = resolve_artifacts(manifest, self.manifest_path)
+        kb = load_verified_knowledge_base(index_path, mapping_path, manifest)
+
+        if kb.index.d != self.model.get_sentence_embedding_dimension():
+            raise ValueError(
+                f"KB {manifest['version']} has dimension {kb.index.d}, "
+                f"expected {self.model.get_sentence_embedding_dimension()}."
+            )
+        if not kb.index.ntotal == len(kb.mapping) == manifest["chunk_count"]:
+            raise ValueError(
+                f"KB {manifest['version']} has {kb.index.ntotal} vectors and "
+                f"{len(kb.mapping)} chunks, expected {manifest['chunk_count']}."
+            )
+        return kb
+
+    def reload(self, blocking: bool = False) -> bool:
+        """
+        Loads the KB described by the manifest and swaps it in. Queries keep
+        running against the old KB while the new one loads, and at most one
+        reload runs at a time so no more than two KBs are held in memory.
+        If another reload is in progress, returns False right away, or waits
+        for it and then checks the manifest again when blocking is True.
+        Also returns False if the manifest version is already loaded; raises
+        ValueError if the new KB is rejected.
+        """
+        if not self._reload_lock.acquire(blocking=blocking):
+            return False
+        try:
+            manifest = load_manifest(self.manifest_path)
+            if manifest is None:
+                raise ValueError(f"No KB manifest found at {self.manifest_path}")
+            if manifest["version"] == self.kb.version:
+                return False
+
+            self.kb = self._load_checked(manifest)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        dedup_threshold: float | None = None,
+    ) -> list[dict]:
+        """
+        If dedup_threshold is set, a result is dropped when its embedding has
+        a cosine similarity >= dedup_threshold with a higher-ranked result.
+        """
+        # Read the KB once so a concurrent reload can't mix index and mapping
+        kb = self.kb
 
-    def retrieve(self, query: str, top_k: int = 5) -> list[dict]:
         query_text = f"query: {query}"
         query_embedding = self.model.encode(
             [query_text], normalize_embeddings=True
         ).astype("float32")
 
-        scores, indices = self.index.search(query_embedding, top_k)
+        search_k = top_k * DEDUP_OVERFETCH if dedup_threshold is not None else top_k
+        scores, indices = kb.index.search(query_embedding, search_k)
 
         results = []
-        for rank, (idx, score) in enumerate(zip(indices[0], scores[0])):
+        kept_vectors = []
+        for idx, score in zip(indices[0], scores[0]):
             if idx < 0:
                 continue
-            chunk = self.mapping[idx].copy()
+            if dedup_threshold is not None:
+                # Index vectors are L2-normalized, so the dot product is the cosine
+                vector = kb.index.reconstruct(int(idx))
+                if any(float(vector @ kept) >= dedup_threshold for kept in kept_vectors):
+                    continue
+                kept_vectors.append(vector)
+
+            chunk = kb.mapping[idx].copy()
             chunk["score"] = float(score)
-            chunk["rank"] = rank + 1
+            chunk["rank"] = len(results) + 1
             results.append(chunk)
+            if len(results) == top_k:
+                break
 
         return results
 
 
+class KBWatcher(threading.Thread):
+    """Polls the KB manifest and reloads the retriever when it changes."""
+
+    def __init__(self, retriever: Retriever, interval: float = 30.0):
+        super().__init__(name="kb-watcher", daemon=True)
+        self.retriever = retriever
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._last_mtime = self._manifest_mtime()
+
+    def _manifest_mtime(self) -> int | None:
+        try:
+            return os.stat(self.retriever.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def check(self):
+        mtime = self._manifest_mtime()
+        if mtime is None or mtime == self._last_mtime:
+            return
+        try:
+            # Wait out a running (e.g. admin-triggered) reload rather than
+            # skipping, so a manifest written meanwhile is never marked as seen
+            reloaded = self.retriever.reload(blocking=True)
+        except ChecksumMismatchError as e:
+            # The artifacts may still be copying in, retry on next poll
+            print(f"KB reload postponed: {e}")
+            return
+        except ValueError as e:
+            print(f"KB reload rejected: {e}")
+            reloaded = False
+
+        self._last_mtime = mtime
+        if reloaded:
+            print(f"Reloaded KB version {self.retriever.kb.version}")
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+
+
 def format_retrieved_context(results: list[dict]) -> str:
     context_parts = []
     for r in results:
         header = f"[{r['rule_title']} | {r['section_title']}]"
+        also_in = [
+            s["section_title"] if s["rule_url"] == r["rule_url"]
+            else f"{s['rule_title']} ({s['rule_date']})"
+            for s in r.get("sources", [])[1:]
+        ]
+        if also_in:
+            # Collapsed chunks are near-duplicates, not identical: wording may differ
+            header += f"\n(متن مشابهی، نه لزوماً یکسان، در این منابع نیز آمده است: {'؛ '.join(also_in)})"
         context_parts.append(f"{header}\n{r['content']}")
     return "\n\n---\n\n".join(context_parts)
 